@@ -1,9 +1,10 @@
-import json
 import logging
+import os
+import orjson
 import apache_beam as beam
 from apache_beam.options.pipeline_options import PipelineOptions
-from typing import Dict, Any
 from config import Config
+from transforms import DrugEventTransforms, event_to_json
 
 # Configure logging
 logging.basicConfig(
@@ -12,100 +13,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class DrugEventTransforms(beam.DoFn):
-    """Transform drug event records."""
-    
-    def process(self, element: Dict[str, Any]):
-        """Process individual drug event records."""
-        try:
-            if not element or 'results' not in element:
-                logger.warning("Invalid record structure")
-                return
-
-            # Process each result in the batch
-            for result in element['results']:
-                if not isinstance(result, dict):
-                    continue
-
-                # Transform the record
-                transformed = {
-                    'report_id': result.get('safetyreportid'),
-                    'receive_date': result.get('receivedate'),
-                    'serious': result.get('serious'),
-                    'patient_age': self._normalize_age(result.get('patient', {})),
-                    'processed': True,
-                    'processing_timestamp': beam.window.TimestampedValue.get_current_timestamp().to_utc_datetime().isoformat()
-                }
-
-                if transformed['report_id']:  # Only yield if we have a valid report ID
-                    yield transformed
-
-        except Exception as e:
-            logger.error(f"Error transforming record: {e}")
-            return
-
-    def _normalize_age(self, patient: Dict[str, Any]) -> float:
-        """Normalize patient age to years."""
-        try:
-            if 'patientonsetage' not in patient:
-                return None
-
-            age = float(patient['patientonsetage'])
-            age_unit = patient.get('patientonsetageunit', 'year')
-
-            if age_unit == 'month':
-                return age / 12
-            elif age_unit == 'day':
-                return age / 365
-            return age
-
-        except (ValueError, TypeError):
-            return None
-
 def run_pipeline():
     """Execute the Apache Beam pipeline."""
-    pipeline_options = PipelineOptions(
-        project=Config.PROJECT,
-        job_name='drug-events-batch-processing',
-        temp_location=f"gs://{Config.BUCKET_NAME}/{Config.TEMP_PATH}",
-        streaming=False,
-        save_main_session=True,
-        runner='DirectRunner'
-    )
+    options = {
+        'project': Config.PROJECT,
+        'job_name': 'drug-events-batch-processing',
+        'temp_location': f"gs://{Config.BUCKET_NAME}/{Config.TEMP_PATH}",
+        'streaming': False,
+        # Workers import transforms by name; no need to pickle __main__
+        'save_main_session': False,
+        'runner': Config.RUNNER
+    }
+
+    if Config.RUNNER == 'FlinkRunner':
+        # Let workers pull splits on demand instead of getting unequal GCS
+        # shards assigned upfront, and share slots across bounded sources
+        options['experiments'] = [
+            'use_lazy_split_enumerator',
+            'common_slot_sharing_group_for_bounded_ios'
+        ]
+    elif Config.RUNNER == 'DirectRunner':
+        # DirectRunner is single-process by default; spread local runs
+        # across all cores (still memory-bound, dev/test only)
+        options['direct_num_workers'] = os.cpu_count()
+        options['direct_running_mode'] = 'multi_processing'
+
+    pipeline_options = PipelineOptions(**options)
 
     try:
         with beam.Pipeline(options=pipeline_options) as p:
-            # Read and process data
+            # Read and process data; records are tagged ok/fail at the source
             processed_data = (
                 p
                 | 'Read JSON Files' >> beam.io.ReadFromText(Config.get_input_path())
-                | 'Parse JSON' >> beam.Map(json.loads)
-                | 'Transform Records' >> beam.ParDo(DrugEventTransforms())
+                | 'Parse JSON' >> beam.Map(orjson.loads)
+                | 'Batch Elements' >> beam.BatchElements(min_batch_size=500, max_batch_size=5000)
+                | 'Transform Records' >> beam.ParDo(DrugEventTransforms()).with_outputs('fail', main='ok')
             )
 
             # Write successful records
-            (processed_data 
-                | 'Filter Successful' >> beam.Filter(lambda x: x.get('processed', False))
-                | 'Format Successful JSON' >> beam.Map(json.dumps)
+            (processed_data.ok
+                | 'Format Successful JSON' >> beam.Map(event_to_json)
                 | 'Write Successful' >> beam.io.WriteToText(
                     Config.get_output_path(),
                     file_name_suffix=".json",
-                    num_shards=Config.NUM_SHARDS
+                    num_shards=Config.NUM_SHARDS,
+                    coder=beam.coders.BytesCoder()
                 )
             )
 
             # Write failed records
-            (processed_data
-                | 'Filter Failed' >> beam.Filter(lambda x: not x.get('processed', False))
-                | 'Format Failed JSON' >> beam.Map(json.dumps)
+            (processed_data.fail
+                | 'Format Failed JSON' >> beam.Map(event_to_json)
                 | 'Write Failed' >> beam.io.WriteToText(
                     f"gs://{Config.BUCKET_NAME}/{Config.FAILED_PATH}",
-                    file_name_suffix=".json"
+                    file_name_suffix=".json",
+                    coder=beam.coders.BytesCoder()
                 )
             )
 
     except Exception as e:
-        logger.error(f"Pipeline failed: {e}")
+        logger.error("Pipeline failed: %s", e)
         raise
 
 if __name__ == "__main__":
@@ -8,6 +8,8 @@ class Config:
     
     # API Settings
     API_URL = 'https://api.fda.gov/drug/event.json?limit=100'
+    PAGE_SIZE = 100
+    NUM_PAGES = int(os.getenv('FDA_NUM_PAGES', '1'))
     
     # Storage paths
     LOCAL_DATA_DIR = 'data'
@@ -18,16 +20,22 @@ class Config:
     
     # Batch processing settings
     NUM_SHARDS = 5
+    RUNNER = os.getenv('BEAM_RUNNER', 'FlinkRunner')
     
     @classmethod
     def get_timestamp(cls) -> str:
         """Get current timestamp string."""
         return datetime.now().strftime('%Y%m%d_%H%M%S')
     
+    @classmethod
+    def get_page_url(cls, skip: int) -> str:
+        """Get API URL for a paginated offset."""
+        return f"{cls.API_URL}&skip={skip}"
+
     @classmethod
     def get_input_path(cls) -> str:
         """Get GCS input path pattern."""
-        return f"gs://{cls.BUCKET_NAME}/{cls.INGESTION_PATH}/*.json"
+        return f"gs://{cls.BUCKET_NAME}/{cls.INGESTION_PATH}/*.ndjson.gz"
     
     @classmethod
     def get_output_path(cls) -> str:
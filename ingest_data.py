@@ -1,6 +1,9 @@
-import requests
-import json
+import asyncio
+import gzip
+import io
 import logging
+import orjson
+import aiohttp
 from google.cloud import storage
 from typing import Dict, Any
 from config import Config
@@ -12,73 +15,71 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def fetch_data(url: str) -> Dict[str, Any]:
-    """Fetch data from the FDA API."""
-    try:
-        logger.info(f"Requesting data from {url}")
-        session = requests.Session()
-        retries = requests.adapters.Retry(
-            total=5,
-            backoff_factor=2,
-            status_forcelist=[500, 502, 503, 504],
-            allowed_methods=["GET"],
-            raise_on_status=False
-        )
-        adapter = requests.adapters.HTTPAdapter(max_retries=retries)
-        session.mount('https://', adapter)
-        session.mount('http://', adapter)
-        
-        # Log connection attempt
-        logger.info("Initiating request with timeout settings: connect=10s, read=60s")
-        
-        response = session.get(url, timeout=(10, 60), stream=True)
-        
-        # Log response headers and status
-        logger.info(f"Response status: {response.status_code}")
-        logger.info(f"Response headers: {dict(response.headers)}")
-        
-        response.raise_for_status()
-        
-        # Track chunked reading progress
-        content = b''
-        chunks_received = 0
-        total_bytes = 0
-        
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                chunks_received += 1
-                total_bytes += len(chunk)
-                content += chunk
-                if chunks_received % 100 == 0:  # Log every 100 chunks
-                    logger.info(f"Download progress: {total_bytes/1024/1024:.2f} MB ({chunks_received} chunks)")
-        
-        logger.info(f"Download completed: {total_bytes/1024/1024:.2f} MB total")
-        return json.loads(content)
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching data: {str(e)}")
-        logger.error(f"Error type: {type(e).__name__}")
-        if hasattr(e, 'response') and e.response is not None:
-            logger.error(f"Response status code: {e.response.status_code}")
-            logger.error(f"Response headers: {dict(e.response.headers)}")
-        raise
-    finally:
-        session.close()
+# Fetch settings
+_TIMEOUT = aiohttp.ClientTimeout(connect=10, sock_read=60)
+_MAX_CONCURRENT = 16
+_MAX_RETRIES = 5
+_RETRY_STATUSES = {500, 502, 503, 504}
+
+# Process-wide singleton: auth-token fetches and connection setup are
+# amortized across uploads instead of paid per request
+_GCS_CLIENT = None
+
+def _gcs_client() -> storage.Client:
+    """Return the shared GCS client, created on first use."""
+    global _GCS_CLIENT
+    if _GCS_CLIENT is None:
+        _GCS_CLIENT = storage.Client()
+    return _GCS_CLIENT
+
+async def fetch_data(session: aiohttp.ClientSession, url: str,
+                     semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """Fetch one page of data from the FDA API."""
+    async with semaphore:
+        logger.info("Requesting data from %s", url)
+        last_error = None
+
+        for attempt in range(_MAX_RETRIES):
+            if attempt:  # back off with no connection held open
+                await asyncio.sleep(2 ** (attempt - 1))
+
+            try:
+                async with session.get(url) as response:
+                    if response.status in _RETRY_STATUSES:
+                        last_error = f"HTTP {response.status}"
+                        continue
+
+                    response.raise_for_status()
+                    content = await response.read()
+            except aiohttp.ClientResponseError:
+                raise  # non-retryable status, e.g. 4xx
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Transient connection/read failure; retry like 5xx
+                last_error = e
+                continue
+
+            logger.info("Download completed: %.2f MB from %s", len(content) / 1048576, url)
+            return orjson.loads(content)
+
+        raise RuntimeError(f"Giving up on {url} after {_MAX_RETRIES} attempts "
+                           f"(last error: {last_error})")
 
 def upload_to_gcs(bucket_name: str, destination_blob: str, data: Dict[str, Any]) -> None:
-    """Upload data directly to Google Cloud Storage."""
+    """Upload results as gzipped NDJSON directly to Google Cloud Storage."""
     try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
+        bucket = _gcs_client().bucket(bucket_name)
         blob = bucket.blob(destination_blob)
-        
-        # Convert dict to JSON string and encode to bytes
-        json_data = json.dumps(data, indent=4)
-        
-        # Upload directly from memory
-        blob.upload_from_string(json_data, content_type='application/json')
-        logger.info(f"Uploaded data to gs://{bucket_name}/{destination_blob}")
+
+        # One result per line so Beam can shard records across workers;
+        # light gzip (level 1) cuts the bytes without burning CPU
+        ndjson = b'\n'.join(orjson.dumps(record) for record in data['results'])
+        buf = gzip.compress(ndjson, compresslevel=1)
+        blob.chunk_size = 8 * 1024 * 1024
+        blob.upload_from_file(io.BytesIO(buf), size=len(buf),
+                              content_type='application/x-ndjson')
+        logger.info("Uploaded %d bytes to gs://%s/%s", len(buf), bucket_name, destination_blob)
     except Exception as e:
-        logger.error(f"Error uploading to GCS: {e}")
+        logger.error("Error uploading to GCS: %s", e)
         raise
 
 def validate_data(data: Dict[str, Any]) -> bool:
@@ -86,23 +87,38 @@ def validate_data(data: Dict[str, Any]) -> bool:
     required_keys = ['results', 'meta']
     return all(key in data for key in required_keys)
 
-def main():
+async def main():
     try:
-        # Generate timestamp for filename
-        filename = f"drug_events_{Config.get_timestamp()}.json"
-        
-        # Fetch and validate data
-        data = fetch_data(Config.API_URL)
-        if not validate_data(data):
-            raise ValueError("Data validation failed: missing required fields")
-        
-        # Upload directly to GCS
-        gcs_path = f"{Config.INGESTION_PATH}/{filename}"
-        upload_to_gcs(Config.BUCKET_NAME, gcs_path, data)
-        
+        # One timestamp per run; pages are distinguished by offset
+        timestamp = Config.get_timestamp()
+        offsets = range(0, Config.NUM_PAGES * Config.PAGE_SIZE, Config.PAGE_SIZE)
+
+        # Fetch all pages concurrently, bounded by the semaphore
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT)
+        async with aiohttp.ClientSession(timeout=_TIMEOUT) as session:
+            pages = await asyncio.gather(
+                *[fetch_data(session, Config.get_page_url(skip), semaphore)
+                  for skip in offsets]
+            )
+
+        # Validate, then upload off the event loop (serialization is CPU-bound)
+        loop = asyncio.get_running_loop()
+        uploads = []
+        for skip, data in zip(offsets, pages):
+            if not validate_data(data):
+                raise ValueError(f"Data validation failed for offset {skip}: "
+                                 "missing required fields")
+
+            filename = f"drug_events_{timestamp}_{skip:06d}.ndjson.gz"
+            gcs_path = f"{Config.INGESTION_PATH}/{filename}"
+            uploads.append(loop.run_in_executor(
+                None, upload_to_gcs, Config.BUCKET_NAME, gcs_path, data))
+
+        await asyncio.gather(*uploads)
+
     except Exception as e:
-        logger.error(f"Pipeline failed: {e}")
+        logger.error("Pipeline failed: %s", e)
         raise
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
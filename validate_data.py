@@ -1,8 +1,12 @@
 # data_quality.py
-import pandas as pd
-import great_expectations as ge
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
 import json
 import logging
+import mmap
+import simdjson
 from typing import Dict, Any, List
 from config import Config
 from google.cloud import storage
@@ -15,75 +19,163 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Fields the checks care about; everything else is dropped at parse time.
+# openFDA encodes every value as a JSON string, so the schema declares
+# strings and numeric casts happen after parsing
+_NDJSON_SCHEMA = pa.schema([
+    ('safetyreportid', pa.string()),
+    ('receivedate', pa.string()),
+    ('patient', pa.struct([
+        ('patientonsetage', pa.string()),
+        ('patientonsetageunit', pa.string())
+    ]))
+])
+
 class DataValidator:
-    """Handles data validation using Great Expectations."""
-    
+    """Handles data validation using field-level parsing and numpy checks."""
+
     def __init__(self):
-        self.expectations = [
-            # Core data quality checks
-            {"name": "expect_column_to_exist", "args": ["safetyreportid"]},
-            {"name": "expect_column_values_to_not_be_null", "args": ["safetyreportid"]},
-            {"name": "expect_column_values_to_be_unique", "args": ["safetyreportid"]},
-            
-            # Date validation
-            {"name": "expect_column_to_exist", "args": ["receivedate"]},
-            {"name": "expect_column_values_to_not_be_null", "args": ["receivedate"]},
-            
-            # Patient data validation
-            {"name": "expect_column_to_exist", "args": ["patient.patientonsetage"]},
-            {"name": "expect_column_values_to_be_between", 
-             "args": ["patient.patientonsetage"], 
-             "kwargs": {"min_value": 0, "max_value": 120}}
-        ]
+        # One parser reused across files; its internal buffer is recycled
+        self._parser = simdjson.Parser()
 
     def validate_file(self, file_path: str) -> Dict[str, Any]:
-        """Validate a single JSON file."""
+        """Validate a single JSON or NDJSON file."""
         try:
-            # Load and prepare data
-            with open(file_path, "r") as f:
-                data = json.load(f)
-            
-            df = pd.DataFrame(data.get('results', []))
-            if df.empty:
-                logger.warning(f"No data found in {file_path}")
-                return {"success": False, "message": "No data found"}
-
-            # Convert to Great Expectations DataFrame
-            ge_df = ge.from_pandas(df)
-            
-            # Apply all expectations
-            results = []
-            for exp in self.expectations:
-                name = exp["name"]
-                args = exp.get("args", [])
-                kwargs = exp.get("kwargs", {})
-                
-                try:
-                    result = getattr(ge_df, name)(*args, **kwargs)
-                    results.append(result)
-                except Exception as e:
-                    logger.error(f"Error applying expectation {name}: {str(e)}")
-                    results.append({"success": False, "expectation": name, "error": str(e)})
+            if file_path.endswith(('.ndjson', '.ndjson.gz')):
+                # Ingestion output: one record per line, parsed straight
+                # into typed Arrow columns with no per-value inference
+                columns = self._extract_columns_ndjson(file_path)
+                if not columns['count']:
+                    logger.warning("No data found in %s", file_path)
+                    return {"success": False, "message": "No data found"}
+            else:
+                # Parse straight from a memory-mapped buffer, no text decode
+                with open(file_path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    try:
+                        doc = self._parser.parse(mm)
+                        try:
+                            results = doc['results']
+                        except KeyError:
+                            results = None
+
+                        if not results:
+                            logger.warning("No data found in %s", file_path)
+                            return {"success": False, "message": "No data found"}
+
+                        # Walk only the validated fields; the rest of each
+                        # record is never materialized
+                        columns = self._extract_columns(results)
+                    finally:
+                        mm.close()
 
             return {
                 "filename": file_path,
                 "timestamp": Config.get_timestamp(),
-                "record_count": len(df),
-                "validation_results": results
+                "record_count": columns['count'],
+                "validation_results": self._run_checks(columns)
             }
 
         except Exception as e:
-            logger.error(f"Error validating file {file_path}: {str(e)}")
+            logger.error("Error validating file %s: %s", file_path, e)
             return {"success": False, "error": str(e)}
 
+    def _extract_columns_ndjson(self, file_path: str) -> Dict[str, Any]:
+        """Read the validated fields from an NDJSON file as Arrow columns."""
+        table = pa_json.read_json(
+            file_path,
+            parse_options=pa_json.ParseOptions(
+                explicit_schema=_NDJSON_SCHEMA,
+                unexpected_field_behavior='ignore'
+            )
+        )
+
+        ages = pc.cast(pc.struct_field(table.column('patient'), 'patientonsetage'),
+                       pa.float32())
+        return {
+            "count": table.num_rows,
+            "report_id": table.column('safetyreportid').to_pylist(),
+            "receive_date": table.column('receivedate').to_pylist(),
+            "age": ages.to_numpy(zero_copy_only=False).astype(np.float16)
+        }
+
+    def _extract_columns(self, results) -> Dict[str, Any]:
+        """Pull just the validated fields out of each record."""
+        count = len(results)
+        report_ids = []
+        receive_dates = []
+        ages = np.empty(count, dtype=np.float16)
+
+        for i, result in enumerate(results):
+            try:
+                report_ids.append(result.at_pointer('/safetyreportid'))
+            except (KeyError, ValueError):
+                report_ids.append(None)
+
+            try:
+                receive_dates.append(result.at_pointer('/receivedate'))
+            except (KeyError, ValueError):
+                receive_dates.append(None)
+
+            try:
+                ages[i] = float(result.at_pointer('/patient/patientonsetage'))
+            except (KeyError, ValueError, TypeError):
+                ages[i] = np.nan
+
+        return {
+            "count": count,
+            "report_id": report_ids,
+            "receive_date": receive_dates,
+            "age": ages
+        }
+
+    def _run_checks(self, columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run all expectations, one vectorized pass per column."""
+        results = []
+        count = columns['count']
+
+        # Core data quality checks
+        report_ids = columns['report_id']
+        results.append(self._check('expect_column_to_exist', 'safetyreportid',
+                                   any(rid is not None for rid in report_ids)))
+        results.append(self._check('expect_column_values_to_not_be_null',
+                                   'safetyreportid',
+                                   all(rid is not None for rid in report_ids)))
+        results.append(self._check('expect_column_values_to_be_unique',
+                                   'safetyreportid',
+                                   len(set(report_ids)) == count))
+
+        # Date validation
+        receive_dates = columns['receive_date']
+        results.append(self._check('expect_column_to_exist', 'receivedate',
+                                   any(date is not None for date in receive_dates)))
+        results.append(self._check('expect_column_values_to_not_be_null',
+                                   'receivedate',
+                                   all(date is not None for date in receive_dates)))
+
+        # Patient data validation; NaN marks missing/unparseable ages
+        ages = columns['age']
+        known = ages[~np.isnan(ages)]
+        results.append(self._check('expect_column_to_exist',
+                                   'patient.patientonsetage', known.size > 0))
+        results.append(self._check('expect_column_values_to_be_between',
+                                   'patient.patientonsetage',
+                                   bool(((known >= 0) & (known <= 120)).all())))
+
+        return results
+
+    def _check(self, expectation: str, column: str, success: bool) -> Dict[str, Any]:
+        """Build a single validation result entry."""
+        return {"expectation": expectation, "column": column, "success": bool(success)}
+
     def save_results(self, results: Dict[str, Any], output_path: str):
         """Save validation results to file."""
         try:
             with open(output_path, 'w') as f:
                 json.dump(results, f, indent=2)
-            logger.info(f"Validation results saved to {output_path}")
+            logger.info("Validation results saved to %s", output_path)
         except Exception as e:
-            logger.error(f"Error saving results: {str(e)}")
+            logger.error("Error saving results: %s", e)
             raise
 
 def main():
@@ -98,11 +190,11 @@ def main():
         # Validate each file in the data directory
         input_dir = os.path.join(Config.LOCAL_DATA_DIR, Config.INGESTION_PATH)
         for filename in os.listdir(input_dir):
-            if filename.endswith('.json'):
+            if filename.endswith(('.json', '.ndjson', '.ndjson.gz')):
                 file_path = os.path.join(input_dir, filename)
                 
                 # Run validation
-                logger.info(f"Validating file: {filename}")
+                logger.info("Validating file: %s", filename)
                 results = validator.validate_file(file_path)
                 
                 # Save results
@@ -111,13 +203,13 @@ def main():
                 validator.save_results(results, output_path)
                 
                 # Log summary
-                success_count = sum(1 for r in results.get('validation_results', []) 
+                success_count = sum(1 for r in results.get('validation_results', [])
                                   if r.get('success', False))
-                logger.info(f"Validation complete: {success_count}/{len(results.get('validation_results', []))} "
-                          f"expectations passed")
+                logger.info("Validation complete: %d/%d expectations passed",
+                            success_count, len(results.get('validation_results', [])))
 
     except Exception as e:
-        logger.error(f"Validation pipeline failed: {str(e)}")
+        logger.error("Validation pipeline failed: %s", e)
         raise
 
 if __name__ == "__main__":